@@ -1,17 +1,23 @@
 # main.py - YouTrack MCP Server
 
+import asyncio
 import json
 import sys
+import os
 import logging
 import argparse
+import threading
 from typing import Dict, Any, List, Optional, Callable
 
 # Import the YouTrack API module
 from youtrack_api import (
+    YouTrackClient,
     search_issues, 
     get_issue, 
+    get_issues,
     update_issue, 
     add_comment,
+    add_comments,
 )
 
 # Setup logging
@@ -29,11 +35,16 @@ TOOLS = {
     "youtrack_get_issue": get_issue,
     "youtrack_update_issue": update_issue,
     "youtrack_add_comment": add_comment,
+    "youtrack_get_issues": get_issues,
+    "youtrack_add_comments": add_comments,
     
     # MCP-specific service functions
     "server_info": lambda: {"status": "ok", "version": "0.1.0", "server": "YouTrack MCP Server"}
 }
 
+# Tools that modify YouTrack; removed from TOOLS in read-only mode
+WRITE_TOOLS = ("youtrack_update_issue", "youtrack_add_comment", "youtrack_add_comments")
+
 def parse_arguments():
     """Parse command line arguments for the MCP server."""
     parser = argparse.ArgumentParser(description='YouTrack MCP Server')
@@ -62,6 +73,34 @@ def parse_arguments():
     
     return args
 
+# YouTrack connection settings; --youtrack-url/--youtrack-token override the environment
+youtrack_settings = {
+    "youtrack_url": os.environ.get("YOUTRACK_URL", ""),
+    "youtrack_token": os.environ.get("YOUTRACK_TOKEN", ""),
+}
+
+# Background event loop and HTTP client shared by all requests, so YouTrack
+# connections are kept alive across tool calls instead of reopened every time
+_api_loop: Optional[asyncio.AbstractEventLoop] = None
+_api_client = None
+_api_loop_lock = threading.Lock()
+
+async def _call_api_tool(tool_function: Callable, params: Dict[str, Any]) -> Any:
+    """Call an async YouTrack API function with the shared client (runs on the API loop)."""
+    global _api_client
+    if _api_client is None:
+        _api_client = YouTrackClient(**youtrack_settings)
+    return await tool_function(_api_client, **params)
+
+def run_api_tool(tool_function: Callable, params: Dict[str, Any]) -> Any:
+    """Run an async YouTrack API function on the background API loop and wait for its result."""
+    global _api_loop
+    with _api_loop_lock:
+        if _api_loop is None:
+            _api_loop = asyncio.new_event_loop()
+            threading.Thread(target=_api_loop.run_forever, name="youtrack-api", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(_call_api_tool(tool_function, params), _api_loop).result()
+
 def validate_request(request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Validates the incoming MCP request format.
@@ -97,8 +136,10 @@ def execute_tool(request_data: Dict[str, Any]) -> Dict[str, Any]:
     
     try:
         # Call the tool function with the provided parameters
-        logger.debug(f"Executing tool '{tool_name}' with params: {params}")
-        if params:
+        logger.debug("Executing tool '%s' with params: %s", tool_name, params)
+        if asyncio.iscoroutinefunction(tool_function):
+            result = run_api_tool(tool_function, params)
+        elif params:
             result = tool_function(**params)
         else:
             result = tool_function()
@@ -108,13 +149,13 @@ def execute_tool(request_data: Dict[str, Any]) -> Dict[str, Any]:
             "result": result
         }
     except TypeError as e:
-        logger.error(f"Parameter error executing {tool_name}: {e}")
+        logger.error("Parameter error executing %s: %s", tool_name, e)
         return {
             "status": "error",
             "error": f"Invalid parameters: {str(e)}"
         }
     except Exception as e:
-        logger.error(f"Error executing {tool_name}: {e}")
+        logger.error("Error executing %s: %s", tool_name, e)
         return {
             "status": "error",
             "error": str(e)
@@ -130,7 +171,7 @@ def handle_request(request_data: Dict[str, Any]) -> str:
     Returns:
         str: JSON string response
     """
-    logger.debug(f"Received request: {request_data}")
+    logger.debug("Received request: %s", request_data)
     
     # Validate request format
     validation_error = validate_request(request_data)
@@ -186,7 +227,7 @@ def start_sse_transport(port):
             """Einfacher Health-Check-Endpunkt"""
             return {"status": "ok", "version": "0.1.0", "env": os.environ.get("YOUTRACK_URL", "")}
         
-        logger.info(f"YouTrack MCP Server started (SSE transport) on port {port}")
+        logger.info("YouTrack MCP Server started (SSE transport) on port %s", port)
         app.run(host='0.0.0.0', port=port)
         
     except ImportError:
@@ -219,6 +260,14 @@ def create_app():
 
 if __name__ == "__main__":
     args = parse_arguments()
+    if args.youtrack_url:
+        youtrack_settings["youtrack_url"] = args.youtrack_url
+    if args.youtrack_token:
+        youtrack_settings["youtrack_token"] = args.youtrack_token
+    if args.read_only or os.environ.get("YOUTRACK_READ_ONLY", "false").lower() == "true":
+        logger.info("Read-only mode: write tools are disabled")
+        for tool_name in WRITE_TOOLS:
+            TOOLS.pop(tool_name, None)
     
     # Start the appropriate transport
     if args.transport == 'stdio':
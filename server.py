@@ -5,11 +5,12 @@ import os
 import argparse
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
-from dataclasses import dataclass
-import datetime
+from dataclasses import dataclass, replace
+import functools
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
 import sys
+from pydantic import BaseModel, ConfigDict, TypeAdapter, model_serializer
 
 # Configure logging before anything else - with enhanced debugging for Docker
 log_level = os.environ.get("MCP_LOG_LEVEL", "DEBUG").upper()  # Set default to DEBUG for more information
@@ -24,17 +25,19 @@ logging.getLogger('fastapi').setLevel(logging.INFO)
 logging.getLogger('mcp').setLevel(logging.DEBUG)
 
 logger = logging.getLogger('youtrack-mcp')
-logger.info(f"Initializing YouTrack MCP Server with log level: {log_level}")
-
-# Output server startup message
-print(f"Starting YouTrack MCP Server (Python SDK version) - Log level: {log_level}")
+logger.info("Initializing YouTrack MCP Server with log level: %s", log_level)
 
 # Try to load environment variables from .env file if present
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
+# (python-dotenv is only imported when there is a file to load). The file is looked up
+# next to this script, not in the working directory, since MCP clients launch the
+# server by absolute path from elsewhere.
+dotenv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+if os.path.exists(dotenv_path):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path)
+    except ImportError:
+        pass
 
 # Try to import test configuration if specified
 if len(sys.argv) > 1 and sys.argv[1] == "--test-config":
@@ -48,48 +51,118 @@ if len(sys.argv) > 1 and sys.argv[1] == "--test-config":
 
 # Import YouTrack API functions
 from youtrack_api import (
+    YouTrackClient,
+    DEFAULT_SEARCH_FIELDS,
+    DEFAULT_ISSUE_FIELDS,
+    DEFAULT_UPDATE_FIELDS,
+    DEFAULT_COMMENT_FIELDS,
     search_issues, 
+    iter_search_issues,
     get_issue, 
+    get_issues,
     update_issue, 
     add_comment,
+    add_comments,
 )
 
 # MCP server instance
+SERVER_VERSION = "0.2.0"
 server_name = os.environ.get("MCP_SERVER_NAME", "YouTrack MCP Server")
 
+@dataclass(frozen=True)
+class Config:
+    youtrack_url: str
+    youtrack_token: str
+    read_only: bool
+    server_name: str
+    host: str
+    port: int
+    log_level: str
+
+@functools.lru_cache(maxsize=1)
+def _env_config() -> Config:
+    """Resolve the server configuration from the environment once (after .env is loaded)"""
+    return Config(
+        youtrack_url=os.environ.get("YOUTRACK_URL", ""),
+        youtrack_token=os.environ.get("YOUTRACK_TOKEN", ""),
+        read_only=os.environ.get("YOUTRACK_READ_ONLY", "false").lower() == "true",
+        server_name=server_name,
+        host=os.environ.get("MCP_HOST", "0.0.0.0"),
+        port=int(os.environ.get("MCP_PORT", "8000")),
+        log_level=log_level,
+    )
+
+# Set from the command line in __main__; takes precedence over the environment
+_cli_config: Optional[Config] = None
+
+def _config() -> Config:
+    """Get the server configuration"""
+    return _cli_config or _env_config()
+
 # Add lifecycle management for the server
 @dataclass
 class AppContext:
     youtrack_url: str
     youtrack_token: str
     read_only: bool
+    client: YouTrackClient
 
 @asynccontextmanager
 async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
     """Manage application lifecycle with context"""
     # Initialize on startup
-    youtrack_url = os.environ.get("YOUTRACK_URL", "")
-    youtrack_token = os.environ.get("YOUTRACK_TOKEN", "")
-    read_only = os.environ.get("YOUTRACK_READ_ONLY", "false").lower() == "true"
+    cfg = _config()
+    youtrack_url = cfg.youtrack_url
+    youtrack_token = cfg.youtrack_token
+    read_only = cfg.read_only
     
     if not youtrack_url or not youtrack_token:
         logger.warning("YouTrack URL or token not configured. Set YOUTRACK_URL and YOUTRACK_TOKEN environment variables.")
     
-    logger.info(f"Starting YouTrack MCP Server with URL: {youtrack_url}")
-    logger.info(f"Read-only mode: {read_only}")
+    logger.info("Starting YouTrack MCP Server with URL: %s", youtrack_url)
+    logger.info("Read-only mode: %s", read_only)
     
+    # One client for the whole server lifetime so connections are pooled and reused
+    client = YouTrackClient(youtrack_url, youtrack_token)
     try:
         yield AppContext(
             youtrack_url=youtrack_url, 
             youtrack_token=youtrack_token,
-            read_only=read_only
+            read_only=read_only,
+            client=client
         )
     finally:
         # Cleanup on shutdown
+        await client.aclose()
         logger.info("Shutting down YouTrack MCP Server")
 
-def parse_arguments():
-    """Parse command line arguments for the MCP server."""
+# Typed tool results. Unknown keys (custom fields, "$type") are kept as-is, and only
+# the keys YouTrack returned are serialized, so a custom `fields` selector does not
+# gain null entries for the declared fields it did not ask for.
+class _YouTrackEntity(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    @model_serializer(mode="wrap")
+    def _serialize_set_fields(self, handler) -> Dict[str, Any]:
+        return {key: value for key, value in handler(self).items() if key in self.model_fields_set}
+
+class ProjectRef(_YouTrackEntity):
+    shortName: Optional[str] = None
+
+class IssueBrief(_YouTrackEntity):
+    idReadable: Optional[str] = None
+    summary: Optional[str] = None
+    project: Optional[ProjectRef] = None
+
+_issue_briefs = TypeAdapter(List[IssueBrief])
+
+# Tool input for youtrack_add_comments, validated by FastMCP before the tool runs
+class CommentItem(BaseModel):
+    issue_id: str
+    comment_text: str
+
+def parse_arguments() -> Config:
+    """Parse command line arguments for the MCP server into its configuration."""
     parser = argparse.ArgumentParser(description='YouTrack MCP Server')
     parser.add_argument('--read-only', action='store_true',
                        help='Run in read-only mode (disables all write operations)')
@@ -100,28 +173,31 @@ def parse_arguments():
     
     args = parser.parse_args()
     
-    # Set environment variables from command line arguments
-    if args.youtrack_url:
-        os.environ["YOUTRACK_URL"] = args.youtrack_url
-    if args.youtrack_token:
-        os.environ["YOUTRACK_TOKEN"] = args.youtrack_token
-    if args.read_only:
-        os.environ["YOUTRACK_READ_ONLY"] = "true"
-    
-    return args
+    # Command line arguments override the environment configuration
+    env_config = _env_config()
+    return replace(
+        env_config,
+        youtrack_url=args.youtrack_url or env_config.youtrack_url,
+        youtrack_token=args.youtrack_token or env_config.youtrack_token,
+        read_only=args.read_only or env_config.read_only,
+    )
 
 # Configure MCP server
 mcp = FastMCP(
     server_name, 
     lifespan=app_lifespan,
-    dependencies=["requests>=2.0.0", "python-dotenv>=0.19.0"]
+    dependencies=["httpx[http2,brotli]>=0.24.0", "cachetools>=5.0.0", "orjson>=3.8.0", "tenacity>=8.2.0", "python-dotenv>=0.19.0"]
 )
 
+def _get_client(ctx: Context) -> YouTrackClient:
+    """Get the shared YouTrack client from the lifespan context"""
+    return ctx.request_context.lifespan_context.client
+
 # Define YouTrack tools
 
 @mcp.tool()
-def youtrack_search_issues(query: str, fields: str = "idReadable,summary,project(shortName)", 
-                          custom_fields: str = None, top: int = 100, skip: int = 0) -> Dict[str, Any]:
+async def youtrack_search_issues(query: str, ctx: Context, fields: str = DEFAULT_SEARCH_FIELDS, 
+                                custom_fields: str = None, top: int = 100, skip: int = 0) -> Union[List[IssueBrief], Dict[str, Any]]:
     """
     Search for issues in YouTrack using a query.
     
@@ -132,12 +208,48 @@ def youtrack_search_issues(query: str, fields: str = "idReadable,summary,project
         top: The maximum number of issues to return
         skip: The number of issues to skip from the beginning of the results
     """
-    logger.info(f"Searching YouTrack issues with query: '{query}'")
-    return search_issues(query, fields, custom_fields, top, skip)
+    logger.info("Searching YouTrack issues with query: '%s'", query)
+    result = await search_issues(_get_client(ctx), query, fields, custom_fields, top, skip)
+    # Error responses are dictionaries and are passed through unchanged
+    if isinstance(result, list):
+        return _issue_briefs.validate_python(result)
+    return result
+
+@mcp.tool()
+async def youtrack_search_issues_stream(query: str, ctx: Context, fields: str = DEFAULT_SEARCH_FIELDS, 
+                                       custom_fields: str = None, page_size: int = 25, max_pages: int = 4) -> Union[List[IssueBrief], Dict[str, Any]]:
+    """
+    Search for issues in YouTrack page by page, reporting progress after each page.
+    
+    If a later page fails, the issues fetched so far are returned together with the
+    error as {"issues": [...], "error": ..., "status": "error"}.
+    
+    Args:
+        query: The search query string (YouTrack query syntax)
+        fields: Comma-separated list of fields to return for each issue
+        custom_fields: Additional comma-separated list of custom fields to include
+        page_size: The number of issues to fetch per page
+        max_pages: The maximum number of pages to fetch
+    """
+    logger.info("Searching YouTrack issues page by page with query: '%s'", query)
+    issues = []
+    pages = 0
+    async for page in iter_search_issues(_get_client(ctx), query, fields, custom_fields, page_size, max_pages):
+        if not isinstance(page, list):
+            # Keep what was already fetched, but tell the caller the list is incomplete
+            if not issues:
+                return page
+            logger.warning("Stopping paged search after %d pages: %s", pages, page)
+            return {**page, "issues": _issue_briefs.validate_python(issues)}
+        issues.extend(page)
+        pages += 1
+        await ctx.report_progress(pages, max_pages)
+        await ctx.info(f"Fetched page {pages} with {len(page)} issues")
+    return _issue_briefs.validate_python(issues)
 
 @mcp.tool()
-def youtrack_get_issue(issue_id: str, fields: str = "idReadable,summary,description,project(shortName),customFields(projectCustomField(field(name)),value(name,login,fullName,text))", 
-                      custom_fields: str = None) -> Dict[str, Any]:
+async def youtrack_get_issue(issue_id: str, ctx: Context, fields: str = DEFAULT_ISSUE_FIELDS, 
+                            custom_fields: str = None) -> Dict[str, Any]:
     """
     Get details for a specific YouTrack issue by its ID.
     
@@ -146,11 +258,11 @@ def youtrack_get_issue(issue_id: str, fields: str = "idReadable,summary,descript
         fields: Comma-separated list of fields to return for the issue
         custom_fields: Additional comma-separated list of custom fields to include
     """
-    logger.info(f"Getting details for YouTrack issue: {issue_id}")
-    return get_issue(issue_id, fields, custom_fields)
+    logger.info("Getting details for YouTrack issue: %s", issue_id)
+    return await get_issue(_get_client(ctx), issue_id, fields, custom_fields)
 
-@mcp.tool()
-def youtrack_update_issue(issue_id: str, data: Dict[str, Any], fields: str = "idReadable,summary") -> Dict[str, Any]:
+# Write tool, registered by _register_write_tools() unless read-only
+async def youtrack_update_issue(issue_id: str, data: Dict[str, Any], ctx: Context, fields: str = DEFAULT_UPDATE_FIELDS) -> Dict[str, Any]:
     """
     Update an existing YouTrack issue by its ID.
     
@@ -159,11 +271,11 @@ def youtrack_update_issue(issue_id: str, data: Dict[str, Any], fields: str = "id
         data: A dictionary containing the fields to update and their new values
         fields: Comma-separated list of fields to return for the updated issue
     """
-    logger.info(f"Updating YouTrack issue {issue_id}")
-    return update_issue(issue_id, data, fields)
+    logger.info("Updating YouTrack issue %s", issue_id)
+    return await update_issue(_get_client(ctx), issue_id, data, fields)
 
-@mcp.tool()
-def youtrack_add_comment(issue_id: str, comment_text: str, fields: str = "id,text,author(login)") -> Dict[str, Any]:
+# Write tool, registered by _register_write_tools() unless read-only
+async def youtrack_add_comment(issue_id: str, comment_text: str, ctx: Context, fields: str = DEFAULT_COMMENT_FIELDS) -> Dict[str, Any]:
     """
     Add a comment to a YouTrack issue.
     
@@ -172,34 +284,67 @@ def youtrack_add_comment(issue_id: str, comment_text: str, fields: str = "id,tex
         comment_text: The text content of the comment
         fields: Comma-separated list of fields to return for the created comment
     """
-    logger.info(f"Adding comment to YouTrack issue {issue_id}")
-    return add_comment(issue_id, comment_text, fields)
+    logger.info("Adding comment to YouTrack issue %s", issue_id)
+    return await add_comment(_get_client(ctx), issue_id, comment_text, fields)
+
+@mcp.tool()
+async def youtrack_get_issues(issue_ids: List[str], ctx: Context, fields: str = DEFAULT_ISSUE_FIELDS, 
+                             custom_fields: str = None) -> List[Dict[str, Any]]:
+    """
+    Get details for several YouTrack issues at once (fetched concurrently).
+    
+    Args:
+        issue_ids: The IDs of the issues (e.g., ["PROJ-123", "PROJ-124"])
+        fields: Comma-separated list of fields to return for each issue
+        custom_fields: Additional comma-separated list of custom fields to include
+    """
+    logger.info("Getting details for YouTrack issues: %s", issue_ids)
+    return await get_issues(_get_client(ctx), issue_ids, fields, custom_fields)
+
+# Write tool, registered by _register_write_tools() unless read-only
+async def youtrack_add_comments(comments: List[CommentItem], ctx: Context, fields: str = DEFAULT_COMMENT_FIELDS) -> List[Dict[str, Any]]:
+    """
+    Add several comments to YouTrack issues at once (posted concurrently).
+    
+    Args:
+        comments: List of objects with "issue_id" and "comment_text" keys
+        fields: Comma-separated list of fields to return for each created comment
+    """
+    logger.info("Adding %d comments to YouTrack issues", len(comments))
+    return await add_comments(_get_client(ctx), [item.model_dump() for item in comments], fields)
+
+# Write tools are left out of the tool registry entirely in read-only mode,
+# so clients never see (or spend prompt tokens on) tools they cannot use
+WRITE_TOOLS = (youtrack_update_issue, youtrack_add_comment, youtrack_add_comments)
+
+def _register_write_tools(cfg: Config) -> None:
+    """Register the write tools with the MCP server unless it runs in read-only mode"""
+    if cfg.read_only:
+        logger.info("Read-only mode: write tools are not registered")
+        return
+    for tool in WRITE_TOOLS:
+        mcp.tool()(tool)
 
 # Resource for server info
+# The payload only depends on the final configuration, so it is built once on first request
+@functools.lru_cache(maxsize=1)
+def _server_info() -> Dict[str, Any]:
+    cfg = _config()
+    return {
+        "status": "ok", 
+        "version": SERVER_VERSION, 
+        "server": cfg.server_name,
+        "youtrack_url": cfg.youtrack_url or "Not configured",
+        "host_binding": cfg.host,
+        "port": str(cfg.port),
+        "debug_mode": cfg.log_level == "DEBUG"
+    }
+
 @mcp.resource("server://info")
 def server_info() -> Dict[str, Any]:
     """Get YouTrack MCP Server information"""
     logger.debug("server://info resource requested")
-    try:
-        result = {
-            "status": "ok", 
-            "version": "0.2.0", 
-            "server": server_name,
-            "youtrack_url": os.environ.get("YOUTRACK_URL", "Not configured"),
-            "host_binding": os.environ.get("MCP_HOST", "0.0.0.0"),
-            "port": os.environ.get("MCP_PORT", "8000"),
-            "debug_mode": log_level == "DEBUG"
-        }
-        logger.debug(f"Returning server info: {result}")
-        return result
-    except Exception as e:
-        logger.error(f"Error in server://info: {str(e)}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return {
-            "status": "error",
-            "message": str(e)
-        }
+    return _server_info()
 
 # Resource for accessing YouTrack projects
 @mcp.resource("youtrack://projects")
@@ -208,57 +353,54 @@ def get_projects() -> str:
     return "This resource provides access to YouTrack projects. Use youtrack_search_issues tool to query projects."
 
 # Health check endpoint for Docker container monitoring
+# Only the timestamp changes between requests
+_HEALTH_STATUS = {"status": "healthy", "version": SERVER_VERSION}
+
 @mcp.resource("mcp://health")
 def health_check() -> Dict[str, Any]:
     """Health check endpoint for Docker container monitoring"""
     logger.debug("Health check requested")
-    return {
-        "status": "healthy",
-        "timestamp": datetime.datetime.now().isoformat(),
-        "version": "0.2.0"
-    }
+    import datetime
+    return {**_HEALTH_STATUS, "timestamp": datetime.datetime.now().isoformat()}
 
 # Explicitly register the tools/list endpoint
+# Built from the FastMCP tool registry on first request (after the write tools are registered)
+_tools_list: Optional[Dict[str, Any]] = None
+
 @mcp.resource("mcp://tools/list")
-def list_tools():
+async def list_tools() -> Dict[str, Any]:
     """List all available tools in this MCP server"""
-    # This will automatically return all registered tools
-    return {
-        "tools": [
-            {
-                "name": "youtrack_search_issues",
-                "description": "Search for issues in YouTrack using a query"
-            },
-            {
-                "name": "youtrack_get_issue",
-                "description": "Get details for a specific YouTrack issue by its ID"
-            },
-            {
-                "name": "youtrack_update_issue",
-                "description": "Update an existing YouTrack issue by its ID"
-            },
-            {
-                "name": "youtrack_add_comment",
-                "description": "Add a comment to a YouTrack issue"
-            }
-        ]
-    }
+    global _tools_list
+    if _tools_list is None:
+        _tools_list = {
+            "tools": [
+                # Summary line only; clients get the full docstring from the MCP tools/list request
+                {"name": tool.name, "description": (tool.description or "").strip().split("\n")[0]}
+                for tool in await mcp.list_tools()
+            ]
+        }
+    return _tools_list
 
 if __name__ == "__main__":
     # Parse command line arguments
-    args = parse_arguments()
+    _cli_config = parse_arguments()
+    cfg = _config()
     
     # Configure for Docker operation
     # Note: MCP SDK uses uvicorn internally which binds to 0.0.0.0 by default
-    host = os.environ.get("MCP_HOST", "0.0.0.0")  # Not directly used, but logged for info
-    port = int(os.environ.get("MCP_PORT", "8000"))  # Not directly used, but logged for info
+    host = cfg.host  # Not directly used, but logged for info
+    port = cfg.port  # Not directly used, but logged for info
     
     # Set UVicorn environment variables that will be picked up by FastMCP
     os.environ["UVICORN_HOST"] = host
     os.environ["UVICORN_PORT"] = str(port)
     
-    logger.info(f"Starting MCP server on {host}:{port} with transport: HTTP")
+    logger.info("Starting MCP server on %s:%s with transport: HTTP", host, port)
+    _register_write_tools(cfg)
     
     # Run the server without specifying transport - FastMCP automatically uses HTTP
     # Default transport is 'stdio', but when UVICORN_* variables are set, it uses HTTP
     mcp.run()
+else:
+    # Imported by the MCP CLI (mcp dev / mcp install): configured from the environment only
+    _register_write_tools(_config())
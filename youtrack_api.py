@@ -1,36 +1,128 @@
 # youtrack_api.py - Functions for interacting with YouTrack API
 
-import requests
+import asyncio
+import functools
+import httpx
+import logging
+import orjson
 import os
-from typing import Dict, Any, Optional, List
-
-# Configuration - Will be handled via environment variables or MCP context
-YOUTRACK_URL = os.environ.get("YOUTRACK_URL", "")
-YOUTRACK_TOKEN = os.environ.get("YOUTRACK_TOKEN", "")
-
-def _get_headers() -> Dict[str, str]:
-    """Get headers for YouTrack API requests"""
-    token = os.environ.get("YOUTRACK_TOKEN", YOUTRACK_TOKEN)
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
+import time
+from cachetools import LRUCache, TTLCache
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from typing import AsyncIterator, Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# Connection settings for the shared client: short connect timeout, generous read timeout
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=3.05)
+CONNECTION_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+
+# Transient failures (timeouts, network errors, gateway errors) are retried with jittered backoff
+RETRY_ATTEMPTS = 3
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# After this many consecutive failed requests, calls fail fast locally for CIRCUIT_COOLDOWN seconds
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+
+# Maximum number of requests a batch call keeps in flight at once
+BATCH_CONCURRENCY = 10
+
+# Default field selections for the API functions and MCP tools
+DEFAULT_SEARCH_FIELDS = "idReadable,summary,project(shortName)"
+DEFAULT_ISSUE_FIELDS = "idReadable,summary,description,project(shortName),customFields(projectCustomField(field(name)),value(name,login,fullName,text))"
+DEFAULT_UPDATE_FIELDS = "idReadable,summary"
+DEFAULT_COMMENT_FIELDS = "id,text,author(login)"
+
+# GET responses are served from memory for CACHE_TTL seconds, then revalidated via ETag
+CACHE_SIZE = 1024
+CACHE_TTL = 30
+
+class YouTrackClient:
+    """
+    Connection to a YouTrack instance, shared by all API calls.
+
+    Created once the configuration is final (e.g. in the MCP server lifespan) and
+    passed to the API functions, so URL, token and headers are bound a single time.
+
+    Attributes:
+        base_url (str): Base URL of the YouTrack REST API (".../api").
+        headers (dict): Headers sent with every request, including the bearer token.
+        session (httpx.AsyncClient): Pooled HTTP client used for all requests.
+        cache (TTLCache): Recent GET responses, keyed by (endpoint, sorted params).
+        etags (LRUCache): Last ETag and response per GET key, used for If-None-Match.
+        generation (int): Bumped by every write; GET results from an older generation are not cached.
+        failures (int): Consecutive failed requests (server errors or transport failures).
+        circuit_open_until (float): time.monotonic() until which requests are not sent.
+    """
+
+    def __init__(self, youtrack_url: str, youtrack_token: str):
+        # Remove quotes if present (Docker env vars might add them)
+        youtrack_url = youtrack_url.strip('"').strip("'")
+        self.base_url = f"{youtrack_url}/api"
+        self.headers = {
+            "Authorization": f"Bearer {youtrack_token}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        # Keep-alive pool shared by all calls, multiplexed over HTTP/2 where the server supports it
+        transport = httpx.AsyncHTTPTransport(http2=True, limits=CONNECTION_LIMITS)
+        self.session = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=REQUEST_TIMEOUT,
+            transport=transport,
+            # Like requests, follow redirects (e.g. http -> https); httpx drops Authorization cross-origin
+            follow_redirects=True,
+        )
+        self.cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+        self.etags = LRUCache(maxsize=CACHE_SIZE)
+        self.cache_lock = asyncio.Lock()
+        self.generation = 0
+        self.failures = 0
+        self.circuit_open_until = 0.0
+
+    def record_success(self) -> None:
+        """Reset the circuit breaker after YouTrack answered a request."""
+        self.failures = 0
 
-def _get_youtrack_url() -> str:
-    """Get YouTrack URL from environment variables"""
-    url = os.environ.get("YOUTRACK_URL", YOUTRACK_URL)
-    # Remove quotes if present (Docker env vars might add them)
-    url = url.strip('"').strip("'")
-    return url
+    def record_failure(self) -> None:
+        """Count a failed request; open the circuit once the failure threshold is reached."""
+        self.failures += 1
+        if self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self.circuit_open_until = time.monotonic() + CIRCUIT_COOLDOWN
+            logger.warning("YouTrack failed %d times in a row, pausing requests for %.0f seconds",
+                           self.failures, CIRCUIT_COOLDOWN)
+
+    async def invalidate_issue(self, issue_id: str) -> None:
+        """Drop cached responses for an issue (and all searches) after it was modified."""
+        issue_endpoint = f"issues/{issue_id}"
+        async with self.cache_lock:
+            # GETs still in flight may carry pre-write data; they must not repopulate the cache
+            self.generation += 1
+            for key in list(self.cache):
+                endpoint = key[0]
+                if endpoint in ("issues", issue_endpoint) or endpoint.startswith(f"{issue_endpoint}/"):
+                    del self.cache[key]
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connections."""
+        await self.session.aclose()
+
+    async def __aenter__(self) -> "YouTrackClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
 # --- Placeholder Functions --- #
 
-def search_issues(query: str, fields: str = "idReadable,summary,project(shortName)", custom_fields: str = None, top: int = 100, skip: int = 0):
+async def search_issues(client: YouTrackClient, query: str, fields: str = DEFAULT_SEARCH_FIELDS, custom_fields: str = None, top: int = 100, skip: int = 0):
     """
     Search for issues in YouTrack using a query.
 
     Args:
+        client (YouTrackClient): The shared YouTrack connection.
         query (str): The search query string (YouTrack query syntax).
         fields (str): Comma-separated list of fields to return for each issue.
                       Defaults to "idReadable,summary,project(shortName)".
@@ -44,22 +136,49 @@ def search_issues(query: str, fields: str = "idReadable,summary,project(shortNam
     endpoint = "issues"
     params = {
         "query": query,
-        "fields": fields,
+        # Ensure custom fields are added correctly to the main fields parameter
+        "fields": _merge_fields(fields, custom_fields),
         "$top": top,
         "$skip": skip,
     }
-    if custom_fields:
-        # Ensure custom fields are added correctly to the main fields parameter
-        params["fields"] += f",{custom_fields}"
 
-    print(f"Searching YouTrack issues with query: '{query}'...") # Keep a print for visibility
-    return _make_request("GET", endpoint, params=params)
+    logger.debug("Searching YouTrack issues with query: '%s'", query)
+    return await _make_request(client, "GET", endpoint, params=params)
+
+async def iter_search_issues(client: YouTrackClient, query: str, fields: str = DEFAULT_SEARCH_FIELDS, custom_fields: str = None, page_size: int = 25, max_pages: int = 4) -> AsyncIterator[Any]:
+    """
+    Search for issues in YouTrack page by page.
+
+    Pages are only requested while the caller keeps iterating, so a consumer that has
+    enough matches can stop early instead of fetching everything up front.
+
+    Args:
+        client (YouTrackClient): The shared YouTrack connection.
+        query (str): The search query string (YouTrack query syntax).
+        fields (str): Comma-separated list of fields to return for each issue.
+        custom_fields (str, optional): Comma-separated list of custom fields to include.
+        page_size (int): The number of issues per page. Defaults to 25.
+        max_pages (int): The maximum number of pages to fetch. Defaults to 4.
+
+    Yields:
+        list or dict: One list of issues per page, or an error dictionary (which ends the iteration).
+    """
+    if page_size < 1:
+        yield {"error": "page_size must be at least 1", "status": "error"}
+        return
+    for page in range(max_pages):
+        result = await search_issues(client, query, fields, custom_fields, top=page_size, skip=page * page_size)
+        yield result
+        # Stop after an error or a short (last) page
+        if not isinstance(result, list) or len(result) < page_size:
+            return
 
-def get_issue(issue_id: str, fields: str = "idReadable,summary,description,project(shortName),customFields(projectCustomField(field(name)),value(name,login,fullName,text))", custom_fields: str = None):
+async def get_issue(client: YouTrackClient, issue_id: str, fields: str = DEFAULT_ISSUE_FIELDS, custom_fields: str = None):
     """
     Get details for a specific YouTrack issue by its ID.
 
     Args:
+        client (YouTrackClient): The shared YouTrack connection.
         issue_id (str): The ID of the issue (e.g., "PROJ-123").
         fields (str): Comma-separated list of fields to return for the issue.
                       Defaults to a comprehensive set including common fields and custom fields.
@@ -70,19 +189,18 @@ def get_issue(issue_id: str, fields: str = "idReadable,summary,description,proje
         dict: A dictionary containing the issue details or an error dictionary.
     """
     endpoint = f"issues/{issue_id}"
-    params = {"fields": fields}
-    if custom_fields:
-        # Append custom fields if they are specified separately
-        params["fields"] += f",{custom_fields}"
+    # Append custom fields if they are specified separately
+    params = {"fields": _merge_fields(fields, custom_fields)}
 
-    print(f"Getting details for YouTrack issue: {issue_id}...")
-    return _make_request("GET", endpoint, params=params)
+    logger.debug("Getting details for YouTrack issue: %s", issue_id)
+    return await _make_request(client, "GET", endpoint, params=params)
 
-def update_issue(issue_id: str, data: dict, fields: str = "idReadable,summary"):
+async def update_issue(client: YouTrackClient, issue_id: str, data: dict, fields: str = DEFAULT_UPDATE_FIELDS):
     """
     Update an existing YouTrack issue by its ID.
 
     Args:
+        client (YouTrackClient): The shared YouTrack connection.
         issue_id (str): The ID of the issue to update (e.g., "PROJ-123").
         data (dict): A dictionary containing the fields to update and their new values.
                      Example: {"summary": "New summary", "description": "Updated description"}
@@ -97,15 +215,19 @@ def update_issue(issue_id: str, data: dict, fields: str = "idReadable,summary"):
     """
     endpoint = f"issues/{issue_id}"
     params = {"fields": fields}
-    print(f"Updating YouTrack issue {issue_id} with data: {data}...")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Updating YouTrack issue %s with data: %r", issue_id, data)
     # Use POST method and pass data in the json parameter
-    return _make_request("POST", endpoint, params=params, json_data=data)
+    result = await _make_request(client, "POST", endpoint, params=params, json_data=data)
+    await client.invalidate_issue(issue_id)
+    return result
 
-def add_comment(issue_id: str, comment_text: str, fields: str = "id,text,author(login)"):
+async def add_comment(client: YouTrackClient, issue_id: str, comment_text: str, fields: str = DEFAULT_COMMENT_FIELDS):
     """
     Add a comment to a YouTrack issue.
 
     Args:
+        client (YouTrackClient): The shared YouTrack connection.
         issue_id (str): The ID of the issue to comment on (e.g., "PROJ-123").
         comment_text (str): The text content of the comment.
         fields (str): Comma-separated list of fields to return for the created comment.
@@ -117,38 +239,174 @@ def add_comment(issue_id: str, comment_text: str, fields: str = "id,text,author(
     endpoint = f"issues/{issue_id}/comments"
     params = {"fields": fields}
     json_data = {"text": comment_text}
-    print(f"Adding comment to YouTrack issue {issue_id}: '{comment_text[:50]}...'")
-    return _make_request("POST", endpoint, params=params, json_data=json_data)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Adding comment to YouTrack issue %s: '%s...'", issue_id, comment_text[:50])
+    result = await _make_request(client, "POST", endpoint, params=params, json_data=json_data)
+    await client.invalidate_issue(issue_id)
+    return result
+
+async def get_issues(client: YouTrackClient, issue_ids: List[str], fields: str = DEFAULT_ISSUE_FIELDS, custom_fields: str = None):
+    """
+    Get details for several YouTrack issues concurrently.
+
+    Args:
+        client (YouTrackClient): The shared YouTrack connection.
+        issue_ids (list): The IDs of the issues (e.g., ["PROJ-123", "PROJ-124"]).
+        fields (str): Comma-separated list of fields to return for each issue (see get_issue).
+        custom_fields (str, optional): Additional comma-separated list of custom fields to include.
+
+    Returns:
+        list: One issue details or error dictionary per ID, in the order of issue_ids.
+    """
+    logger.debug("Getting details for %d YouTrack issues", len(issue_ids))
+    return await _gather_bounded(get_issue(client, issue_id, fields, custom_fields) for issue_id in issue_ids)
+
+async def add_comments(client: YouTrackClient, comments: List[Dict[str, str]], fields: str = DEFAULT_COMMENT_FIELDS):
+    """
+    Add several comments to YouTrack issues concurrently.
+
+    Args:
+        client (YouTrackClient): The shared YouTrack connection.
+        comments (list): Dictionaries with "issue_id" and "comment_text" keys, e.g.
+                         [{"issue_id": "PROJ-123", "comment_text": "Fixed in 1.2"}].
+        fields (str): Comma-separated list of fields to return for each created comment.
+                      Defaults to "id,text,author(login)".
+
+    Returns:
+        list: One created comment or error dictionary per entry, in the order of comments.
+    """
+    logger.debug("Adding %d comments to YouTrack issues", len(comments))
+
+    async def _add_one(item):
+        # A malformed entry only fails its own slot in the result list
+        try:
+            issue_id, comment_text = item["issue_id"], item["comment_text"]
+        except (KeyError, TypeError) as e:
+            return {"error": f"Invalid comment entry, expected issue_id and comment_text: {e}", "status": "error"}
+        return await add_comment(client, issue_id, comment_text, fields)
+
+    return await _gather_bounded(_add_one(item) for item in comments)
 
 # --- Helper Function --- #
 
-def _make_request(method, endpoint, params=None, json_data=None):
+@functools.lru_cache(maxsize=256)
+def _merge_fields(fields: str, custom_fields: Optional[str]) -> str:
+    """Combine the fields selector with extra custom fields (memoized, callers reuse a few combinations)."""
+    return f"{fields},{custom_fields}" if custom_fields else fields
+
+async def _gather_bounded(coros, limit: int = BATCH_CONCURRENCY) -> List[Any]:
+    """Run API calls concurrently with at most `limit` in flight; exceptions become error dictionaries."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _bounded(coro):
+        async with semaphore:
+            return await coro
+
+    results = await asyncio.gather(*(_bounded(coro) for coro in coros), return_exceptions=True)
+    return [
+        {"error": str(result), "status": "error"} if isinstance(result, Exception) else result
+        for result in results
+    ]
+
+def _is_transient(exc: BaseException) -> bool:
+    """Timeouts, network errors, dropped connections and gateway errors are worth retrying."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRY_STATUS_CODES
+    # RemoteProtocolError is what a pooled keep-alive/HTTP/2 connection raises when the
+    # server closed it while idle ("Server disconnected without sending a response")
+    return isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError))
+
+def _is_connect_error(exc: BaseException) -> bool:
+    """Connection failures mean the request never reached YouTrack."""
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+
+async def _send_with_retry(client: YouTrackClient, method: str, endpoint: str, **kwargs) -> httpx.Response:
+    """Send a request, retrying transient failures with jittered exponential backoff."""
+    # Writes are not idempotent, so they are only retried if the connection could not be made
+    should_retry = _is_transient if method == "GET" else _is_connect_error
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(RETRY_ATTEMPTS),
+        wait=wait_exponential_jitter(initial=0.2, max=2),
+        retry=retry_if_exception(should_retry),
+        reraise=True,
+    ):
+        with attempt:
+            response = await client.session.request(method, endpoint, **kwargs)
+            if response.status_code in RETRY_STATUS_CODES:
+                response.raise_for_status()
+    return response
+
+async def _make_request(client, method, endpoint, params=None, json_data=None):
     """Helper function to make requests to the YouTrack API."""
-    url = f"{_get_youtrack_url()}/api/{endpoint}"
+    # GETs are idempotent: answer from the cache, or revalidate a stale entry with its ETag
+    cache_key = None
+    headers = None
+    if method == "GET":
+        cache_key = (endpoint, tuple(sorted((params or {}).items())))
+        async with client.cache_lock:
+            if cache_key in client.cache:
+                return client.cache[cache_key]
+            etag_entry = client.etags.get(cache_key)
+            generation = client.generation
+        if etag_entry:
+            headers = {"If-None-Match": etag_entry[0]}
+    # Fail fast while YouTrack is known to be down instead of letting callers retry into it
+    retry_after = client.circuit_open_until - time.monotonic()
+    if retry_after > 0:
+        return {"error": "circuit_open", "status": "error", "retry_after": round(retry_after, 1)}
     try:
-        response = requests.request(method, url, headers=_get_headers(), params=params, json=json_data)
-        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        # Bodies are encoded with orjson; Content-Type: application/json is already a client header
+        content = orjson.dumps(json_data) if json_data is not None else None
+        response = await _send_with_retry(client, method, endpoint, params=params, content=content, headers=headers)
+        revalidated = response.status_code == 304 and headers is not None
+        if not revalidated:
+            response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        client.record_success()
         # Handle cases where response might be empty (e.g., 204 No Content)
         if response.status_code == 204:
             return {}
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error making request to {url}: {e}")
+        data = etag_entry[1] if revalidated else orjson.loads(response.content)
+        if cache_key is not None:
+            async with client.cache_lock:
+                if client.generation != generation:
+                    # A write happened while this GET was in flight
+                    return data
+                client.cache[cache_key] = data
+                etag = response.headers.get("ETag")
+                if etag:
+                    client.etags[cache_key] = (etag, data)
+        return data
+    except httpx.HTTPError as e:
+        # Client errors (4xx) mean YouTrack is up; only server errors and transport failures count
+        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+            client.record_success()
+        else:
+            client.record_failure()
+        logger.error("Error making request to %s/%s: %s", client.base_url, endpoint, e)
         # Improved error return for MCP tools
         return {"error": str(e), "status": "error"}
+    except orjson.JSONEncodeError as e:
+        logger.error("Could not encode request body for %s/%s: %s", client.base_url, endpoint, e)
+        return {"error": f"Invalid request data: {e}", "status": "error"}
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        logger.exception("An unexpected error occurred: %s", e)
         return {"error": "An unexpected error occurred", "status": "error"}
 
 # Example usage (for testing purposes)
 if __name__ == "__main__":
+    YOUTRACK_URL = os.environ.get("YOUTRACK_URL", "")
+    YOUTRACK_TOKEN = os.environ.get("YOUTRACK_TOKEN", "")
     if YOUTRACK_URL == "" or YOUTRACK_TOKEN == "":
-        print("Please set YOUTRACK_URL and YOUTRACK_TOKEN environment variables or update them in youtrack_api.py")
+        print("Please set YOUTRACK_URL and YOUTRACK_TOKEN environment variables")
     else:
         # Example: Get details for a specific issue
         issue_id_to_test = "FXS-1673"
         print(f"\nAttempting to get details for issue: {issue_id_to_test}...")
-        issue_details = get_issue(issue_id_to_test)
+        async def _fetch_issue(issue_id):
+            async with YouTrackClient(YOUTRACK_URL, YOUTRACK_TOKEN) as client:
+                return await get_issue(client, issue_id)
+
+        issue_details = asyncio.run(_fetch_issue(issue_id_to_test))
 
         if isinstance(issue_details, dict) and 'error' not in issue_details:
             print(f"\n--- Details for {issue_details.get('idReadable', 'N/A')} ---")
@@ -162,5 +420,6 @@ if __name__ == "__main__":
 
         # You can add calls to other functions like search_issues here for further testing
         # print("\nSearching for issues...")
-        # search_results = search_issues("project: YourProject state: Open", top=5)
+        # (inside an "async with YouTrackClient(...) as client:" block)
+        # search_results = await search_issues(client, "project: YourProject state: Open", top=5)
         # # ... (handle search results as before)